@@ -5,16 +5,9 @@
 # ─────────────────────────────────────────────────────────────
 
 import time
+import queue
 import threading
 
-# Try pygame for sound (optional)
-try:
-    import pygame
-    pygame.mixer.init()
-    SOUND_AVAILABLE = True
-except Exception:
-    SOUND_AVAILABLE = False
-
 ALERT_COLORS = {
     "NORMAL":   "\033[92m",   # Green
     "WARNING":  "\033[93m",   # Yellow
@@ -22,35 +15,88 @@ ALERT_COLORS = {
 }
 RESET = "\033[0m"
 
+ALERT_MESSAGES = {
+    "NORMAL":   "✅ Driver status is NORMAL. All readings within safe range.",
+    "WARNING":  "⚠️  WARNING! Signs of fatigue or elevated heart rate detected.",
+    "CRITICAL": "🚨 CRITICAL ALERT! Immediate danger — pull over now!"
+}
+
+ALERT_ACTIONS = {
+    "NORMAL":   "Continue monitoring.",
+    "WARNING":  "Recommend rest break in 15 minutes.",
+    "CRITICAL": "STOP VEHICLE IMMEDIATELY. Sound alarm."
+}
+
 # ── Alert cooldown tracker ────────────────────────────────────
 _last_alert_time  = {}
 COOLDOWN_SECONDS  = {"NORMAL": 5, "WARNING": 10, "CRITICAL": 3}
 
 
+# ── Beep sounds (mixer started lazily on first alert) ────────
+BEEP_SPECS  = {"WARNING": (800, 0.5), "CRITICAL": (1200, 1.0)}   # (Hz, sec)
+_BEEP_CACHE = {}
+_mixer_ready  = False
+_mixer_failed = False   # Init failed once (no pygame / no audio device) — don't retry
+
+
+def _ensure_mixer():
+    """Start pygame's mixer and build the beep sounds on first use."""
+    global _mixer_ready, _mixer_failed
+    if _mixer_ready:
+        return True
+    if _mixer_failed:
+        return False
+    # Try pygame for sound (optional)
+    mixer_open = False
+    try:
+        import pygame
+        import numpy as np
+        pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=4096)
+        mixer_open = True
+        for level, (freq, dur) in BEEP_SPECS.items():
+            t    = np.arange(int(44100 * dur), dtype=np.float32)
+            wave = (4096 * np.sin(2 * np.pi * freq * t / 44100)).astype(np.int16)
+            _BEEP_CACHE[level] = pygame.sndarray.make_sound(wave)
+        _mixer_ready = True
+        return True
+    except Exception:
+        # No beeps will ever play — don't leave an idle mixer running
+        if mixer_open:
+            try:
+                pygame.mixer.quit()
+            except Exception:
+                pass
+        _BEEP_CACHE.clear()
+        _mixer_failed = True
+        return False
+
+
 def _play_beep(risk_level):
-    """Play alert sound based on risk level (if pygame available)."""
-    if not SOUND_AVAILABLE:
+    """Play the cached alert sound for this risk level (if pygame available)."""
+    if not _ensure_mixer():
         return
-    freq_map = {"WARNING": 800, "CRITICAL": 1200}
-    freq = freq_map.get(risk_level, 0)
-    if freq == 0:
+    snd = _BEEP_CACHE.get(risk_level)
+    if snd is None:
         return
-    duration_ms = 500 if risk_level == "WARNING" else 1000
     try:
-        sound = pygame.sndarray.make_sound(
-            (4096 * (
-                __import__('numpy').sin(
-                    2 * __import__('numpy').pi *
-                    __import__('numpy').arange(44100 * duration_ms // 1000) *
-                    freq / 44100
-                )
-            )).astype(__import__('numpy').int16)
-        )
-        sound.play()
+        snd.play()   # Non-blocking — pygame mixes on its own thread
     except Exception:
         pass  # Silent fallback
 
 
+# ── Beep worker (one persistent thread fed by a small queue) ──
+_beep_q = queue.Queue(maxsize=4)
+
+
+def _beep_worker():
+    """Play queued beeps in FIFO order for the life of the process."""
+    while True:
+        _play_beep(_beep_q.get())
+
+
+threading.Thread(target=_beep_worker, daemon=True).start()
+
+
 def trigger_alert(risk_level: str, source: str = "SYSTEM",
                   details: dict = None) -> dict:
     """
@@ -75,24 +121,12 @@ def trigger_alert(risk_level: str, source: str = "SYSTEM",
     _last_alert_time[risk_level] = now
 
     # ── Build alert message ───────────────────────────────
-    messages = {
-        "NORMAL":   "✅ Driver status is NORMAL. All readings within safe range.",
-        "WARNING":  "⚠️  WARNING! Signs of fatigue or elevated heart rate detected.",
-        "CRITICAL": "🚨 CRITICAL ALERT! Immediate danger — pull over now!"
-    }
-
-    actions = {
-        "NORMAL":   "Continue monitoring.",
-        "WARNING":  "Recommend rest break in 15 minutes.",
-        "CRITICAL": "STOP VEHICLE IMMEDIATELY. Sound alarm."
-    }
-
     alert = {
         "timestamp":   time.strftime("%Y-%m-%d %H:%M:%S"),
         "risk_level":  risk_level,
         "source":      source,
-        "message":     messages.get(risk_level, "Unknown risk level"),
-        "action":      actions.get(risk_level, ""),
+        "message":     ALERT_MESSAGES.get(risk_level, "Unknown risk level"),
+        "action":      ALERT_ACTIONS.get(risk_level, ""),
         "details":     details or {},
         "suppressed":  False
     }
@@ -109,10 +143,12 @@ def trigger_alert(risk_level: str, source: str = "SYSTEM",
             print(f"  {k}: {v}")
     print(f"{'='*55}{RESET}\n")
 
-    # ── Sound alert in background thread ─────────────────
+    # ── Sound alert via background worker ────────────────
     if risk_level in ("WARNING", "CRITICAL"):
-        t = threading.Thread(target=_play_beep, args=(risk_level,), daemon=True)
-        t.start()
+        try:
+            _beep_q.put_nowait(risk_level)
+        except queue.Full:
+            pass  # Burst already queued — drop the extra beep
 
     return alert
 
@@ -122,15 +158,19 @@ class AlertLogger:
 
     def __init__(self):
         self.log = []
+        self._counts = {"CRITICAL": 0, "WARNING": 0, "NORMAL": 0}
 
     def add(self, alert: dict):
         if not alert.get("suppressed"):
             self.log.append(alert)
+            level = alert["risk_level"]
+            self._counts[level] = self._counts.get(level, 0) + 1
 
     def get_summary(self):
-        total    = len(self.log)
-        critical = sum(1 for a in self.log if a["risk_level"] == "CRITICAL")
-        warnings = sum(1 for a in self.log if a["risk_level"] == "WARNING")
+        c        = self._counts
+        total    = sum(c.values())
+        critical = c["CRITICAL"]
+        warnings = c["WARNING"]
         return {
             "total_alerts": total,
             "critical":     critical,
@@ -140,6 +180,7 @@ class AlertLogger:
 
     def clear(self):
         self.log.clear()
+        self._counts = {"CRITICAL": 0, "WARNING": 0, "NORMAL": 0}
 
 
 # ── Test ─────────────────────────────────────────────────────
@@ -8,8 +8,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
-import random
+import os
+from collections import deque
+from itertools import islice
 from datetime import datetime
 
 # ── Page Config ───────────────────────────────────────────────
@@ -55,54 +56,63 @@ with st.sidebar:
 
     st.divider()
     st.subheader("🎯 Thresholds")
-    ear_thresh  = st.slider("EAR Threshold", 0.15, 0.35, 0.25, 0.01,
-                             help="Eye Aspect Ratio — lower = more sensitive")
-    hr_critical = st.slider("Critical Heart Rate", 120, 160, 140,
-                             help="BPM above this → CRITICAL alert")
-    spo2_warn   = st.slider("SpO2 Warning Level (%)", 90, 97, 95,
-                             help="Oxygen below this → WARNING")
+    st.slider("EAR Threshold", 0.15, 0.35, 0.25, 0.01, key="ear_thresh",
+              help="Eye Aspect Ratio — lower = more sensitive")
+    st.slider("Critical Heart Rate", 120, 160, 140, key="hr_critical",
+              help="BPM above this → CRITICAL alert")
+    st.slider("SpO2 Warning Level (%)", 90, 97, 95, key="spo2_warn",
+              help="Oxygen below this → WARNING")
 
 # ── Header ────────────────────────────────────────────────────
 st.title("🚗 Driver Health & Drowsiness AI Monitor")
-st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 st.divider()
 
+# ── Risk Banners (pre-rendered once per risk level) ──────────
+RISK_COLORS = {"NORMAL": "#00ff88", "WARNING": "#ffaa00", "CRITICAL": "#ff3344"}
+RISK_ICONS  = {"NORMAL": "✅", "WARNING": "⚠️", "CRITICAL": "🚨"}
+RISK_MSGS   = {
+    "NORMAL":   "Driver is alert and healthy. All readings within safe range.",
+    "WARNING":  "Signs of fatigue or health anomaly detected. Recommend rest break.",
+    "CRITICAL": "CRITICAL RISK DETECTED! Pull over immediately!"
+}
+
+_BANNERS = {
+    lvl: f"""
+<div style="background:{RISK_COLORS[lvl]}22; border:2px solid {RISK_COLORS[lvl]};
+     border-radius:12px; padding:20px; text-align:center; margin-bottom:20px;">
+    <h2 style="color:{RISK_COLORS[lvl]}; margin:0;">
+        {RISK_ICONS[lvl]} {lvl} RISK
+    </h2>
+    <p style="color:#ccc; margin-top:8px;">{RISK_MSGS[lvl]}</p>
+</div>
+"""
+    for lvl in RISK_COLORS
+}
+
 # ── Simulate sensor data ──────────────────────────────────────
+# Per-scenario (low, high) sampling bounds, one column per _SENSOR_KEYS entry.
+# Integer readings use high + 1 so flooring keeps the upper value reachable.
+_SENSOR_KEYS = ["heart_rate", "hrv", "spo2", "skin_temp", "ear",
+                "blink_rate", "yawn_count", "activity"]
+_INT_KEYS    = ("blink_rate", "yawn_count", "activity")
+_SCENARIOS   = {
+    "normal":   (np.array([65,  40, 97,   33,   0.28, 12, 0, 1]),
+                 np.array([85,  65, 99.5, 35.5, 0.38, 21, 2, 1])),
+    "warning":  (np.array([105, 20, 94,   36,   0.20, 5,  2, 0]),
+                 np.array([125, 30, 96.5, 37.5, 0.26, 13, 5, 0])),
+    "critical": (np.array([135, 10, 91,   37.5, 0.12, 1,  4, 0]),
+                 np.array([155, 18, 94,   39,   0.22, 6,  9, 0])),
+}
+_rng = np.random.default_rng()
+
+
 def simulate_sensor_data(scenario="normal"):
     """Simulate real-time sensor readings."""
-    if scenario == "normal":
-        return {
-            "heart_rate":    random.uniform(65, 85),
-            "hrv":           random.uniform(40, 65),
-            "spo2":          random.uniform(97, 99.5),
-            "skin_temp":     random.uniform(33, 35.5),
-            "ear":           random.uniform(0.28, 0.38),
-            "blink_rate":    random.randint(12, 20),
-            "yawn_count":    random.randint(0, 1),
-            "activity":      1
-        }
-    elif scenario == "warning":
-        return {
-            "heart_rate":    random.uniform(105, 125),
-            "hrv":           random.uniform(20, 30),
-            "spo2":          random.uniform(94, 96.5),
-            "skin_temp":     random.uniform(36, 37.5),
-            "ear":           random.uniform(0.20, 0.26),
-            "blink_rate":    random.randint(5, 12),
-            "yawn_count":    random.randint(2, 4),
-            "activity":      0
-        }
-    else:  # critical
-        return {
-            "heart_rate":    random.uniform(135, 155),
-            "hrv":           random.uniform(10, 18),
-            "spo2":          random.uniform(91, 94),
-            "skin_temp":     random.uniform(37.5, 39),
-            "ear":           random.uniform(0.12, 0.22),
-            "blink_rate":    random.randint(1, 5),
-            "yawn_count":    random.randint(4, 8),
-            "activity":      0
-        }
+    lo, hi = _SCENARIOS.get(scenario, _SCENARIOS["critical"])
+    data = dict(zip(_SENSOR_KEYS, _rng.uniform(lo, hi).tolist()))
+    for key in _INT_KEYS:
+        data[key] = int(data[key])
+    return data
 
 
 def get_risk_level(data, ear_thresh, hr_critical, spo2_warn):
@@ -120,6 +130,77 @@ def get_risk_level(data, ear_thresh, hr_critical, spo2_warn):
         return "NORMAL"
 
 
+# ── Trend History (fixed-size ring buffers, one array per metric) ─
+HISTORY_LEN = 20   # Keep only last 20 readings
+
+
+def new_history():
+    """Empty ring buffer: float32 column per metric plus timestamp labels."""
+    return {
+        "hr":   np.zeros(HISTORY_LEN, dtype=np.float32),
+        "ear":  np.zeros(HISTORY_LEN, dtype=np.float32),
+        "spo2": np.zeros(HISTORY_LEN, dtype=np.float32),
+        "t":    [""] * HISTORY_LEN,
+        "i":    0,   # Total readings written (next slot is i % HISTORY_LEN)
+        "n":    0,   # Readings currently held
+    }
+
+
+def push_history(hist, t, heart_rate, ear, spo2):
+    """Write one reading into the next ring slot, overwriting the oldest."""
+    slot = hist["i"] % HISTORY_LEN
+    hist["hr"][slot]   = heart_rate
+    hist["ear"][slot]  = ear
+    hist["spo2"][slot] = spo2
+    hist["t"][slot]    = t
+    hist["i"] += 1
+    hist["n"]  = min(hist["n"] + 1, HISTORY_LEN)
+
+
+def history_frame(hist):
+    """
+    Oldest-to-newest DataFrame of the buffer. Only built when the charts are
+    (re)seeded — per-tick updates send just the new row to add_rows.
+    """
+    order = np.arange(hist["i"] - hist["n"], hist["i"]) % HISTORY_LEN
+    return pd.DataFrame({
+        "heart_rate": hist["hr"][order],
+        "ear":        hist["ear"][order],
+        "spo2":       hist["spo2"][order],
+    }, index=[hist["t"][k] for k in order])
+
+
+def seed_charts(charts, hist):
+    """(Re)draw both trend charts in their slots from the ring buffer."""
+    hist_df = history_frame(hist)
+    charts["hr"]   = charts["hr_slot"].line_chart(
+        hist_df[["heart_rate"]], color=["#ff6b6b"], height=200)
+    charts["ear"]  = charts["ear_slot"].line_chart(
+        hist_df[["ear"]], color=["#6bcbff"], height=200)
+    charts["rows"] = len(hist_df)
+
+
+# ── Health Model (loaded once per server process) ────────────
+@st.cache_resource
+def get_health_model(path="models/health_model.pkl", onnx_path="models/health.onnx"):
+    """Load the trained RF + GB fusion model once and share it across reruns."""
+    from heart_rate_model import DriverHealthModel, ONNX_AVAILABLE
+    model = DriverHealthModel()
+    model.load(path)
+    # Serve the Random Forest through ONNX Runtime when an export of this
+    # same forest exists (load_onnx checks the fingerprint, else keeps sklearn)
+    if ONNX_AVAILABLE and os.path.exists(onnx_path):
+        model.load_onnx(onnx_path)
+    return model
+
+
+@st.cache_data(ttl=3600)
+def get_training_data(n_samples=2000):
+    """Synthetic training frame, regenerated at most once an hour."""
+    from heart_rate_model import generate_dataset
+    return generate_dataset(n_samples)
+
+
 # ── Scenario Selector ─────────────────────────────────────────
 col_s1, col_s2, col_s3 = st.columns(3)
 with col_s1:
@@ -132,120 +213,133 @@ with col_s3:
     if st.button("🚨 Critical Scenario", use_container_width=True):
         st.session_state["scenario"] = "critical"
 
-scenario = st.session_state.get("scenario", "normal")
-
-# ── Get current sensor data ───────────────────────────────────
-data       = simulate_sensor_data(scenario)
-risk_level = get_risk_level(data, ear_thresh, hr_critical, spo2_warn)
+# ── Live Panel (partial refresh) ──────────────────────────────
+@st.fragment(run_every=f"{refresh_rate}s")
+def live_panel():
+    """Re-run only the live readings, chart rows and alert bookkeeping on each tick."""
+    scenario    = st.session_state.get("scenario", "normal")
+    ear_thresh  = st.session_state["ear_thresh"]
+    hr_critical = st.session_state["hr_critical"]
+    spo2_warn   = st.session_state["spo2_warn"]
+
+    st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # ── Get current sensor data ───────────────────────────────
+    data       = simulate_sensor_data(scenario)
+    risk_level = get_risk_level(data, ear_thresh, hr_critical, spo2_warn)
+
+    # ── Risk Banner ───────────────────────────────────────────
+    st.markdown(_BANNERS[risk_level], unsafe_allow_html=True)
+
+    # ── Metrics Row 1: Vision ─────────────────────────────────
+    st.subheader("👁️ Vision-Based Monitoring")
+    v1, v2, v3, v4 = st.columns(4)
+
+    ear_status = "🔴 ALERT" if data["ear"] < ear_thresh else "🟢 Normal"
+    v1.metric("Eye Aspect Ratio (EAR)", f"{data['ear']:.3f}", ear_status)
+    v2.metric("Blink Rate (per min)",    f"{data['blink_rate']}", 
+              "🔴 Low" if data['blink_rate'] < 8 else "🟢 Normal")
+    v3.metric("Yawn Count",              f"{data['yawn_count']}",
+              "🔴 Frequent" if data['yawn_count'] >= 3 else "🟢 OK")
+    v4.metric("Drowsiness Status",
+              "DROWSY 😴" if data["ear"] < ear_thresh else "ALERT 😊",
+              delta=None)
 
-# ── Risk Banner ───────────────────────────────────────────────
-risk_colors = {"NORMAL": "#00ff88", "WARNING": "#ffaa00", "CRITICAL": "#ff3344"}
-risk_icons  = {"NORMAL": "✅", "WARNING": "⚠️", "CRITICAL": "🚨"}
-risk_msgs   = {
-    "NORMAL":   "Driver is alert and healthy. All readings within safe range.",
-    "WARNING":  "Signs of fatigue or health anomaly detected. Recommend rest break.",
-    "CRITICAL": "CRITICAL RISK DETECTED! Pull over immediately!"
-}
-
-st.markdown(f"""
-<div style="background:{risk_colors[risk_level]}22; border:2px solid {risk_colors[risk_level]};
-     border-radius:12px; padding:20px; text-align:center; margin-bottom:20px;">
-    <h2 style="color:{risk_colors[risk_level]}; margin:0;">
-        {risk_icons[risk_level]} {risk_level} RISK
-    </h2>
-    <p style="color:#ccc; margin-top:8px;">{risk_msgs[risk_level]}</p>
-</div>
-""", unsafe_allow_html=True)
-
-# ── Metrics Row 1: Vision ─────────────────────────────────────
-st.subheader("👁️ Vision-Based Monitoring")
-v1, v2, v3, v4 = st.columns(4)
-
-ear_status = "🔴 ALERT" if data["ear"] < ear_thresh else "🟢 Normal"
-v1.metric("Eye Aspect Ratio (EAR)", f"{data['ear']:.3f}", ear_status)
-v2.metric("Blink Rate (per min)",    f"{data['blink_rate']}", 
-          "🔴 Low" if data['blink_rate'] < 8 else "🟢 Normal")
-v3.metric("Yawn Count",              f"{data['yawn_count']}",
-          "🔴 Frequent" if data['yawn_count'] >= 3 else "🟢 OK")
-v4.metric("Drowsiness Status",
-          "DROWSY 😴" if data["ear"] < ear_thresh else "ALERT 😊",
-          delta=None)
+    st.divider()
 
-st.divider()
+    # ── Metrics Row 2: Health ─────────────────────────────────
+    st.subheader("❤️ Health Monitoring")
+    h1, h2, h3, h4 = st.columns(4)
+
+    h1.metric("Heart Rate (BPM)",   f"{data['heart_rate']:.0f}",
+              "🔴 High" if data['heart_rate'] > hr_critical else "🟢 Normal")
+    h2.metric("HRV (ms)",           f"{data['hrv']:.1f}",
+              "🔴 Low" if data['hrv'] < 20 else "🟢 Normal")
+    h3.metric("SpO2 (%)",           f"{data['spo2']:.1f}",
+              "🔴 Low" if data['spo2'] < spo2_warn else "🟢 Normal")
+    h4.metric("Skin Temp (°C)",     f"{data['skin_temp']:.1f}",
+              "🔴 High" if data['skin_temp'] > 37.5 else "🟢 Normal")
+
+    # ── Trend Data ────────────────────────────────────────────
+    # Ring buffer of the last HISTORY_LEN readings, created once per session
+    if "hist" not in st.session_state:
+        st.session_state["hist"] = new_history()
+
+    # Record this tick's reading, overwriting the oldest slot once full
+    now = datetime.now().strftime("%H:%M:%S")
+    push_history(st.session_state["hist"], now,
+                 data["heart_rate"], data["ear"], data["spo2"])
+
+    # ── Charts ────────────────────────────────────────────────
+    # Slots are drawn by the full script run (None during that run).
+    # Ticks append one row; every HISTORY_LEN rows the charts are re-seeded
+    # from the buffer, so each one holds between 20 and 40 points.
+    charts = st.session_state.get("charts")
+    if charts is not None:
+        if charts["rows"] >= 2 * HISTORY_LEN:
+            seed_charts(charts, st.session_state["hist"])
+        else:
+            charts["hr"].add_rows(
+                pd.DataFrame({"heart_rate": [data["heart_rate"]]}, index=[now]))
+            charts["ear"].add_rows(
+                pd.DataFrame({"ear": [data["ear"]]}, index=[now]))
+            charts["rows"] += 1
+
+    # ── Alert Log (shown by alert_panel below the charts) ─────
+    if "alert_log" not in st.session_state:
+        st.session_state["alert_log"] = deque(maxlen=200)
+
+    if risk_level != "NORMAL":
+        st.session_state["alert_log"].append({
+            "Time":     datetime.now().strftime("%H:%M:%S"),
+            "Risk":     risk_level,
+            "HR (BPM)": round(data["heart_rate"], 1),
+            "EAR":      round(data["ear"], 3),
+            "SpO2 (%)": round(data["spo2"], 1),
+            "Source":   "FUSION MODEL"
+        })
+
+
+@st.fragment(run_every=f"{refresh_rate}s")
+def alert_panel():
+    """Re-run only the alert log table on each tick."""
+    st.divider()
+    st.subheader("📋 Alert Log")
+
+    alert_log = st.session_state["alert_log"]
+    if alert_log:
+        log_df = pd.DataFrame(list(islice(alert_log, max(len(alert_log) - 10, 0), None)))
+        st.dataframe(log_df, use_container_width=True, hide_index=True)
+        if st.button("🗑️ Clear Log"):
+            alert_log.clear()
+    else:
+        st.info("No alerts recorded yet in this session.")
 
-# ── Metrics Row 2: Health ─────────────────────────────────────
-st.subheader("❤️ Health Monitoring")
-h1, h2, h3, h4 = st.columns(4)
 
-h1.metric("Heart Rate (BPM)",   f"{data['heart_rate']:.0f}",
-          "🔴 High" if data['heart_rate'] > hr_critical else "🟢 Normal")
-h2.metric("HRV (ms)",           f"{data['hrv']:.1f}",
-          "🔴 Low" if data['hrv'] < 20 else "🟢 Normal")
-h3.metric("SpO2 (%)",           f"{data['spo2']:.1f}",
-          "🔴 Low" if data['spo2'] < spo2_warn else "🟢 Normal")
-h4.metric("Skin Temp (°C)",     f"{data['skin_temp']:.1f}",
-          "🔴 High" if data['skin_temp'] > 37.5 else "🟢 Normal")
+# Chart slots from the previous full run are stale once the page redraws
+st.session_state.pop("charts", None)
 
-st.divider()
+live_panel()
 
 # ── Charts ────────────────────────────────────────────────────
+st.divider()
 st.subheader("📊 Live Trend (Simulated)")
 
-# Generate fake history
-if "history" not in st.session_state:
-    st.session_state["history"] = []
-
-st.session_state["history"].append({
-    "time":       datetime.now().strftime("%H:%M:%S"),
-    "heart_rate": data["heart_rate"],
-    "ear":        data["ear"],
-    "spo2":       data["spo2"],
-})
-
-# Keep only last 20 readings
-if len(st.session_state["history"]) > 20:
-    st.session_state["history"] = st.session_state["history"][-20:]
-
-hist_df = pd.DataFrame(st.session_state["history"]).set_index("time")
-
 c1, c2 = st.columns(2)
 with c1:
-    st.line_chart(hist_df[["heart_rate"]], color=["#ff6b6b"], height=200)
+    hr_slot = st.empty()
     st.caption("Heart Rate (BPM)")
 with c2:
-    st.line_chart(hist_df[["ear"]], color=["#6bcbff"], height=200)
+    ear_slot = st.empty()
     st.caption("Eye Aspect Ratio (EAR)")
 
-# ── Alert Log ─────────────────────────────────────────────────
-st.divider()
-st.subheader("📋 Alert Log")
-
-if "alert_log" not in st.session_state:
-    st.session_state["alert_log"] = []
-
-if risk_level != "NORMAL":
-    st.session_state["alert_log"].append({
-        "Time":     datetime.now().strftime("%H:%M:%S"),
-        "Risk":     risk_level,
-        "HR (BPM)": round(data["heart_rate"], 1),
-        "EAR":      round(data["ear"], 3),
-        "SpO2 (%)": round(data["spo2"], 1),
-        "Source":   "FUSION MODEL"
-    })
-
-if st.session_state["alert_log"]:
-    log_df = pd.DataFrame(st.session_state["alert_log"][-10:])
-    st.dataframe(log_df, use_container_width=True, hide_index=True)
-    if st.button("🗑️ Clear Log"):
-        st.session_state["alert_log"] = []
-else:
-    st.info("No alerts recorded yet in this session.")
+charts = {"hr_slot": hr_slot, "ear_slot": ear_slot}
+seed_charts(charts, st.session_state["hist"])
+st.session_state["charts"] = charts
+
+alert_panel()
 
 # ── Footer ────────────────────────────────────────────────────
 st.divider()
 st.caption("🎓 DSCET Final Year Project 2026 — Surendhar N & Paul Francis | "
            "AI-Based Driver Health & Drowsiness Risk Prediction System")
-
-# ── Auto-refresh ─────────────────────────────────────────────
-time.sleep(refresh_rate)
-st.rerun()
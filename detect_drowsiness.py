@@ -7,10 +7,22 @@
 import cv2
 import dlib
 import numpy as np
+import math
 from imutils import face_utils
-from scipy.spatial import distance as dist
+import threading
 import time
 
+# Try numba to JIT the per-frame EAR/MAR math (optional)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Pure-Python fallback: leave the function undecorated."""
+        return lambda func: func
+
 # ── Constants ──────────────────────────────────────────────
 EAR_THRESHOLD    = 0.25   # Below this → eye is considered closed
 EAR_CONSEC_FRAMES = 20    # Frames eye must be closed to trigger drowsy alert
@@ -22,20 +34,30 @@ YAWN_THRESHOLD   = 0.6    # Mouth aspect ratio threshold for yawn detection
 (M_START, M_END) = face_utils.FACIAL_LANDMARKS_IDXS["mouth"]
 
 
+@njit(cache=True, fastmath=True)
+def _dist(pts, i, j):
+    """Euclidean distance between landmark rows i and j."""
+    dx = pts[i, 0] - pts[j, 0]
+    dy = pts[i, 1] - pts[j, 1]
+    return math.sqrt(dx * dx + dy * dy)
+
+
+@njit(cache=True, fastmath=True)
 def eye_aspect_ratio(eye):
     """Calculate Eye Aspect Ratio (EAR) — drops when eye closes."""
-    A = dist.euclidean(eye[1], eye[5])
-    B = dist.euclidean(eye[2], eye[4])
-    C = dist.euclidean(eye[0], eye[3])
+    A = _dist(eye, 1, 5)
+    B = _dist(eye, 2, 4)
+    C = _dist(eye, 0, 3)
     return (A + B) / (2.0 * C)
 
 
+@njit(cache=True, fastmath=True)
 def mouth_aspect_ratio(mouth):
     """Calculate Mouth Aspect Ratio (MAR) — rises when yawning."""
-    A = dist.euclidean(mouth[13], mouth[19])
-    B = dist.euclidean(mouth[14], mouth[18])
-    C = dist.euclidean(mouth[15], mouth[17])
-    D = dist.euclidean(mouth[12], mouth[16])
+    A = _dist(mouth, 13, 19)
+    B = _dist(mouth, 14, 18)
+    C = _dist(mouth, 15, 17)
+    D = _dist(mouth, 12, 16)
     return (A + B + C) / (3.0 * D)
 
 
@@ -52,13 +74,39 @@ class DrowsinessDetector:
         self.yawning      = False
         self.start_time   = time.time()
 
-    def process_frame(self, frame):
+        # Face detection runs on a half-size frame every DETECT_EVERY frames;
+        # in between, the last face boxes are reused for landmark fitting.
+        self.DETECT_EVERY = 5
+        self.DETECT_SCALE = 0.5
+        self.frame_idx    = 0
+        self.last_rects   = []
+
+        # Compile EAR/MAR now so the first real frame isn't hit by JIT time.
+        # Same dtype as face_utils.shape_to_np; distinct points avoid 0/0.
+        dummy = np.arange(40, dtype=int).reshape(20, 2)
+        eye_aspect_ratio(dummy[:6])
+        mouth_aspect_ratio(dummy)
+
+    def process_frame(self, frame, annotate: bool = True):
         """
         Process a single frame.
+        annotate=False skips all drawing (headless callers only need status).
         Returns: (annotated_frame, status_dict)
         """
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        rects = self.detector(gray, 0)
+
+        # ── Face detection (downscaled, every Nth frame) ─────
+        if self.frame_idx % self.DETECT_EVERY == 0 or not self.last_rects:
+            gray_small = cv2.resize(gray, (0, 0), fx=self.DETECT_SCALE,
+                                    fy=self.DETECT_SCALE)
+            up = 1.0 / self.DETECT_SCALE
+            self.last_rects = [
+                dlib.rectangle(int(r.left() * up), int(r.top() * up),
+                               int(r.right() * up), int(r.bottom() * up))
+                for r in self.detector(gray_small, 0)
+            ]
+        self.frame_idx += 1
+        rects = self.last_rects
 
         status = {
             "face_detected": False,
@@ -95,8 +143,9 @@ class DrowsinessDetector:
                 if self.counter >= EAR_CONSEC_FRAMES:
                     self.drowsy = True
                     status["drowsy"] = True
-                    cv2.putText(frame, "⚠ DROWSINESS ALERT!", (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+                    if annotate:
+                        cv2.putText(frame, "⚠ DROWSINESS ALERT!", (10, 30),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
             else:
                 if self.counter >= 3:
                     self.blink_count += 1
@@ -110,11 +159,15 @@ class DrowsinessDetector:
                     self.yawn_count += 1
                 self.yawning = True
                 status["yawning"] = True
-                cv2.putText(frame, "😮 YAWN DETECTED", (10, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+                if annotate:
+                    cv2.putText(frame, "😮 YAWN DETECTED", (10, 60),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
             else:
                 self.yawning = False
 
+            if not annotate:
+                continue
+
             # ── Draw Eye & Mouth Contours ─────────────────
             for eye in [left_eye, right_eye]:
                 hull = cv2.convexHull(eye)
@@ -123,10 +176,9 @@ class DrowsinessDetector:
             mouth_hull = cv2.convexHull(mouth)
             cv2.drawContours(frame, [mouth_hull], -1, (0, 255, 255), 1)
 
-            # ── EAR & MAR display ────────────────────────
-            cv2.putText(frame, f"EAR: {ear:.2f}", (frame.shape[1]-150, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            cv2.putText(frame, f"Blinks: {self.blink_count}", (frame.shape[1]-150, 55),
+            # ── EAR & Blink display (single text render) ─
+            cv2.putText(frame, f"EAR: {ear:.2f}  Blinks: {self.blink_count}",
+                        (frame.shape[1]-260, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
         # ── Risk Level ───────────────────────────────────
@@ -140,20 +192,60 @@ class DrowsinessDetector:
         return frame, status
 
 
+class FrameGrabber:
+    """
+    Reads the camera on a background thread and keeps only the newest frame,
+    so the detector never works through a backlog of stale buffered frames.
+    """
+
+    def __init__(self, cap):
+        self.cap     = cap
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.stopped = False
+        self._frame  = None
+        self._lock   = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self.stopped:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.stopped = True
+                break
+            with self._lock:
+                self._frame = frame
+
+    def latest(self):
+        """Return the newest unseen frame, or None if none has arrived yet."""
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
+
+    def stop(self):
+        self.stopped = True
+        self._thread.join(timeout=1.0)
+
+
 # ── Standalone test ──────────────────────────────────────────
 if __name__ == "__main__":
     detector = DrowsinessDetector()
     cap = cv2.VideoCapture(0)
+    grabber = FrameGrabber(cap)
 
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame, status = detector.process_frame(frame)
+        frame = grabber.latest()
+        if frame is None:
+            if grabber.stopped:
+                break
+            time.sleep(0.005)   # No new frame yet
+            continue
+        frame, status = detector.process_frame(frame, annotate=True)
         print(status)
         cv2.imshow("Drowsiness Monitor", frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    grabber.stop()
     cap.release()
     cv2.destroyAllWindows()
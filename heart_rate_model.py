@@ -12,15 +12,20 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
+import hashlib
+import importlib.util
 import os
 
+# ONNX Runtime for faster RF inference (optional, imported only when used)
+ONNX_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+
 # ── Risk Labels ──────────────────────────────────────────────
 RISK_LABELS = {0: "NORMAL", 1: "WARNING", 2: "CRITICAL"}
 RISK_COLORS = {"NORMAL": "green", "WARNING": "orange", "CRITICAL": "red"}
 
 
 # ── Generate Synthetic Dataset (use real dataset if available) ─
-def generate_dataset(n_samples=2000, save_path="health/dataset.csv"):
+def generate_dataset(n_samples=2000, save_path="health/dataset.parquet"):
     """
     Generate a synthetic heart rate dataset for training.
     Replace with real wearable sensor data for production.
@@ -33,71 +38,65 @@ def generate_dataset(n_samples=2000, save_path="health/dataset.csv"):
     - activity_level   : 0=rest, 1=light, 2=moderate, 3=active
     - time_of_day_hr   : Hour of day (0-23)
     """
-    np.random.seed(42)
-
-    data = []
-    for _ in range(n_samples):
-        activity = np.random.randint(0, 4)
-
-        # Normal driver ranges
-        if activity == 0:   # Resting
-            hr   = np.random.normal(70, 8)
-            hrv  = np.random.normal(55, 10)
-            spo2 = np.random.normal(98, 1)
-        elif activity == 1: # Light
-            hr   = np.random.normal(85, 10)
-            hrv  = np.random.normal(45, 8)
-            spo2 = np.random.normal(97.5, 1)
-        elif activity == 2: # Moderate
-            hr   = np.random.normal(100, 12)
-            hrv  = np.random.normal(35, 7)
-            spo2 = np.random.normal(97, 1.2)
-        else:               # Active
-            hr   = np.random.normal(120, 15)
-            hrv  = np.random.normal(25, 6)
-            spo2 = np.random.normal(96.5, 1.5)
-
-        skin_temp   = np.random.normal(34, 1.5)
-        time_of_day = np.random.randint(0, 24)
-
-        # ── Assign Risk Label ─────────────────────────
-        if (hr > 140 or hr < 45 or spo2 < 94 or
-                hrv < 15 or skin_temp > 38):
-            label = 2  # CRITICAL
-        elif (hr > 110 or hr < 55 or spo2 < 96 or
-              hrv < 25 or time_of_day in range(1, 5)):
-            label = 1  # WARNING (nighttime driving also risky)
-        else:
-            label = 0  # NORMAL
+    rng = np.random.default_rng(42)
+    n   = n_samples
+
+    # Normal driver ranges, indexed by activity (rest / light / moderate / active)
+    activity = rng.integers(0, 4, n)
+    hr   = rng.normal(np.array([70, 85, 100, 120])[activity],
+                      np.array([8, 10, 12, 15])[activity])
+    hrv  = rng.normal(np.array([55, 45, 35, 25])[activity],
+                      np.array([10, 8, 7, 6])[activity])
+    spo2 = rng.normal(np.array([98, 97.5, 97, 96.5])[activity],
+                      np.array([1, 1, 1.2, 1.5])[activity])
+
+    skin_temp   = rng.normal(34, 1.5, n)
+    time_of_day = rng.integers(0, 24, n)
 
-        data.append([
-            round(hr, 1), round(hrv, 1), round(spo2, 1),
-            round(skin_temp, 1), activity, time_of_day, label
-        ])
+    # ── Assign Risk Label (nighttime driving also risky) ─
+    critical = ((hr > 140) | (hr < 45) | (spo2 < 94) |
+                (hrv < 15) | (skin_temp > 38))
+    warning  = ((hr > 110) | (hr < 55) | (spo2 < 96) |
+                (hrv < 25) | ((time_of_day >= 1) & (time_of_day <= 4)))
+    label = np.where(critical, 2, np.where(warning, 1, 0))
 
-    df = pd.DataFrame(data, columns=[
-        "heart_rate", "hrv", "spo2",
-        "skin_temp", "activity_level", "time_of_day_hr", "risk_label"
-    ])
+    df = pd.DataFrame({
+        "heart_rate":     np.round(hr, 1),
+        "hrv":            np.round(hrv, 1),
+        "spo2":           np.round(spo2, 1),
+        "skin_temp":      np.round(skin_temp, 1),
+        "activity_level": activity,
+        "time_of_day_hr": time_of_day,
+        "risk_label":     label,
+    })
 
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    df.to_csv(save_path, index=False)
+    df.to_parquet(save_path, index=False)
     print(f"[INFO] Dataset saved to {save_path} — {len(df)} samples")
     return df
 
 
 # ── Fusion Model Class ────────────────────────────────────────
 class DriverHealthModel:
-    def __init__(self):
+    # ONNX Runtime sessions shared by all instances, keyed by model path
+    _onnx_sessions = {}
+
+    def __init__(self, use_scaler=False):
         self.rf_model  = RandomForestClassifier(
-            n_estimators=100, max_depth=8,
+            n_estimators=100, max_depth=8, n_jobs=-1,
             random_state=42, class_weight="balanced"
         )
         self.gb_model  = GradientBoostingClassifier(
             n_estimators=100, learning_rate=0.1,
             max_depth=5, random_state=42
         )
+        # Tree ensembles are scale-invariant; keep the scaler only for
+        # models that need it (e.g. a future linear member of the fusion).
+        self.use_scaler = use_scaler
         self.scaler    = StandardScaler()
+        self._mean     = None
+        self._inv      = None
+        self._rf_sess  = None
         self.is_trained = False
         self.feature_cols = [
             "heart_rate", "hrv", "spo2",
@@ -106,20 +105,28 @@ class DriverHealthModel:
 
     def train(self, df):
         """Train both models on the dataset."""
-        X = df[self.feature_cols].values
+        X = df[self.feature_cols].to_numpy(dtype=np.float32)
         y = df["risk_label"].values
 
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=y
         )
 
-        # Scale features
-        X_train = self.scaler.fit_transform(X_train)
-        X_test  = self.scaler.transform(X_test)
+        self._rf_sess = None   # A retrained forest must not be served by an old ONNX export
+
+        # Scale features (optional)
+        if self.use_scaler:
+            self.scaler.fit(X_train)
+            self._cache_scaler()
+            X_train = self._scale(X_train)
+            X_test  = self._scale(X_test)
 
         # Train both models
         print("[INFO] Training Random Forest...")
+        self.rf_model.set_params(n_jobs=-1)   # Build trees on all cores
         self.rf_model.fit(X_train, y_train)
+        # Single-reading predict is faster without a joblib thread pool
+        self.rf_model.set_params(n_jobs=1)
 
         print("[INFO] Training Gradient Boosting...")
         self.gb_model.fit(X_train, y_train)
@@ -142,6 +149,17 @@ class DriverHealthModel:
         self.is_trained = True
         return accuracy_score(y_test, fused)
 
+    def _cache_scaler(self):
+        """Keep the fitted scaler's mean and 1/scale as float32 arrays."""
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._inv  = (1.0 / self.scaler.scale_).astype(np.float32)
+
+    def _scale(self, X):
+        """Standardise X inline with NumPy (no-op when scaling is off)."""
+        if not self.use_scaler:
+            return X
+        return (X - self._mean) * self._inv
+
     def _fuse_predictions(self, rf_proba, gb_proba, rf_weight=0.45, gb_weight=0.55):
         """Weighted average fusion of RF + GB probabilities."""
         combined = (rf_weight * rf_proba) + (gb_weight * gb_proba)
@@ -153,45 +171,123 @@ class DriverHealthModel:
         if not self.is_trained:
             raise RuntimeError("Model not trained yet. Call train() first.")
 
-        features = np.array([[
+        features = np.asarray([[
             heart_rate, hrv, spo2,
             skin_temp, activity_level, time_of_day_hr
-        ]])
-        features_scaled = self.scaler.transform(features)
-
-        rf_proba = self.rf_model.predict_proba(features_scaled)
-        gb_proba = self.gb_model.predict_proba(features_scaled)
-        label    = self._fuse_predictions(rf_proba, gb_proba)[0]
-        confidence = max(
-            ((0.45 * rf_proba) + (0.55 * gb_proba))[0]
-        )
+        ]], dtype=np.float32)
+        features_scaled = self._scale(features)
+
+        rf_proba, gb_proba = self._predict_proba(features_scaled)
+        fused      = (0.45 * rf_proba) + (0.55 * gb_proba)
+        label      = int(np.argmax(fused, axis=1)[0])
+        confidence = float(fused[0].max())
 
         return {
-            "risk_label": int(label),
+            "risk_label": label,
             "risk_level": RISK_LABELS[label],
-            "confidence": round(float(confidence) * 100, 1),
+            "confidence": round(confidence * 100, 1),
             "heart_rate": heart_rate,
             "hrv": hrv,
             "spo2": spo2,
             "skin_temp": skin_temp
         }
 
+    def predict_batch(self, X):
+        """Predict risk labels for an (N, 6) array of readings in one call."""
+        if not self.is_trained:
+            raise RuntimeError("Model not trained yet. Call train() first.")
+
+        X_scaled = self._scale(np.asarray(X, dtype=np.float32))
+        return self._fuse_predictions(*self._predict_proba(X_scaled))
+
+    def _predict_proba(self, X):
+        """RF and GB class probabilities (RF via ONNX Runtime when loaded)."""
+        if self._rf_sess is not None:
+            rf_proba = self._rf_sess.run(
+                None, {"X": X.astype(np.float32, copy=False)}
+            )[1]
+        else:
+            rf_proba = self.rf_model.predict_proba(X)
+        return rf_proba, self.gb_model.predict_proba(X)
+
+    def _forest_fingerprint(self):
+        """Hash of the RF tree structure — ties an ONNX export to its forest."""
+        h = hashlib.sha1()
+        for est in self.rf_model.estimators_:
+            tree = est.tree_
+            for arr in (tree.feature, tree.threshold, tree.value):
+                h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+    def export_onnx(self, path="models/health.onnx"):
+        """Convert the trained Random Forest to ONNX for onnxruntime inference."""
+        if not self.is_trained:
+            raise RuntimeError("Model not trained yet. Call train() first.")
+        try:
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:
+            raise RuntimeError("ONNX export needs skl2onnx installed.")
+
+        onx = convert_sklearn(
+            self.rf_model,
+            initial_types=[("X", FloatTensorType([None, len(self.feature_cols)]))],
+            options={id(self.rf_model): {"zipmap": False}}
+        )
+        meta = onx.metadata_props.add()
+        meta.key, meta.value = "forest_sha1", self._forest_fingerprint()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(onx.SerializeToString())
+        self._onnx_sessions.pop(path, None)   # Next load_onnx() reads the new file
+        print(f"[INFO] ONNX Random Forest saved to {path}")
+
+    def load_onnx(self, path="models/health.onnx"):
+        """
+        Run the Random Forest through ONNX Runtime from an exported model.
+        Returns False (and keeps sklearn) if the export is of another forest.
+        """
+        if not ONNX_AVAILABLE:
+            raise RuntimeError("ONNX inference needs onnxruntime installed.")
+        if path not in self._onnx_sessions:
+            import onnxruntime as ort
+            self._onnx_sessions[path] = ort.InferenceSession(
+                path, providers=["CPUExecutionProvider"]
+            )
+        sess = self._onnx_sessions[path]
+
+        exported = sess.get_modelmeta().custom_metadata_map.get("forest_sha1")
+        if exported != self._forest_fingerprint():
+            print(f"[WARN] {path} was exported from a different Random Forest "
+                  "— using scikit-learn for RF inference")
+            return False
+
+        self._rf_sess = sess
+        print(f"[INFO] ONNX Random Forest loaded from {path}")
+        return True
+
     def save(self, path="models/health_model.pkl"):
         """Save trained model to disk."""
         os.makedirs(os.path.dirname(path), exist_ok=True)
         joblib.dump({
             "rf": self.rf_model,
             "gb": self.gb_model,
-            "scaler": self.scaler
+            "scaler": self.scaler,
+            "use_scaler": self.use_scaler
         }, path)
         print(f"[INFO] Model saved to {path}")
 
     def load(self, path="models/health_model.pkl"):
         """Load saved model from disk."""
         data = joblib.load(path)
-        self.rf_model  = data["rf"]
+        self.rf_model  = data["rf"].set_params(n_jobs=1)   # Older saves kept n_jobs=-1
         self.gb_model  = data["gb"]
         self.scaler    = data["scaler"]
+        # Older saves have no flag and were always trained on scaled features
+        self.use_scaler = data.get("use_scaler", True)
+        if self.use_scaler:
+            self._cache_scaler()
+        self._rf_sess   = None   # Call load_onnx() again for the new forest
         self.is_trained = True
         print(f"[INFO] Model loaded from {path}")
 
@@ -202,6 +298,10 @@ if __name__ == "__main__":
     model = DriverHealthModel()
     model.train(df)
     model.save()
+    if importlib.util.find_spec("skl2onnx") is not None:
+        model.export_onnx()
+        if ONNX_AVAILABLE:
+            model.load_onnx()
     print("\n[TEST] Sample prediction:")
     print(model.predict(heart_rate=135, hrv=18, spo2=93,
                         skin_temp=37.5, activity_level=1, time_of_day_hr=3))